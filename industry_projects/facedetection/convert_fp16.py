@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+FP16 Model Conversion Script
+Writes <model>.fp16.onnx next to each ONNX model; FaceAnalysis.prepare() loads these
+instead of the FP32 files when running on the GPU (ctx_id >= 0).
+
+Inputs and outputs stay FP32, so preprocessing and model_zoo type detection are unchanged.
+The detector is deliberately not converted (anchor decoding needs full precision).
+
+Requires onnx and onnxconverter-common (offline only, not needed at runtime).
+
+Usage:
+    python convert_fp16.py                                   # adaface + genderage
+    python convert_fp16.py models/l/adaface.onnx             # specific model(s)
+"""
+
+import argparse
+import sys
+
+import onnx
+from onnxconverter_common import float16
+
+DEFAULT_MODELS = ['models/l/adaface.onnx', 'models/l/genderage.onnx']
+
+
+def convert_model_fp16(model_path):
+    """Write an FP16 copy of an ONNX model next to it and return its path"""
+    model = onnx.load(model_path)
+    model_fp16 = float16.convert_float_to_float16(model, keep_io_types=True)
+    fp16_path = model_path[:-len('.onnx')] + '.fp16.onnx'
+    onnx.save(model_fp16, fp16_path)
+    return fp16_path
+
+
+def main():
+    """Convert the given (or default) models"""
+    parser = argparse.ArgumentParser(description='Convert ONNX models to FP16')
+    parser.add_argument('models', nargs='*', default=DEFAULT_MODELS,
+                        help='ONNX model paths (default: recognition and gender/age models)')
+    args = parser.parse_args()
+    
+    for model_path in args.models:
+        if not model_path.endswith('.onnx'):
+            print(f"Error: '{model_path}' is not an .onnx file")
+            sys.exit(1)
+        print(f"Converted {model_path} -> {convert_model_fp16(model_path)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,10 +4,63 @@ Eye Detection Demo Script
 This script demonstrates different usage examples of the eye detection system.
 """
 
+import functools
+import json
 import subprocess
 import sys
 import os
 
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv')
+
+def _scan_media(exts):
+    """List files in the current directory with one of the given extensions"""
+    # The directory mtime changes whenever entries are added or removed, so it keys the cache
+    return _scan_media_cached(os.getcwd(), os.stat('.').st_mtime_ns, exts)
+
+@functools.lru_cache(maxsize=16)
+def _scan_media_cached(cwd, cwd_mtime, exts):
+    """Enumerate media files with os.scandir, reusing the cached d_type instead of stat() per file"""
+    with os.scandir(cwd) as it:
+        return tuple(e.name for e in it if e.is_file(follow_symlinks=False) and e.name.lower().endswith(exts))
+
+def _start_worker():
+    """Start one long-running detection process so the model is loaded only once per demo session"""
+    return subprocess.Popen([sys.executable, 'eye_detection_script.py', '--server'],
+                            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, bufsize=1)
+
+def _run_in_worker(worker, **command):
+    """Send one JSON command to the worker and return its reply dict (None if the worker died)"""
+    try:
+        worker.stdin.write(json.dumps(command) + '\n')
+        worker.stdin.flush()
+    except BrokenPipeError:
+        print("Error: detection worker is not running")
+        return None
+    
+    try:
+        reply = worker.stdout.readline()
+    except KeyboardInterrupt:
+        # The worker is interrupted too and still answers the current command
+        reply = worker.stdout.readline()
+    
+    if not reply:
+        print("Error: detection worker exited unexpectedly")
+        return None
+    
+    reply = json.loads(reply)
+    if reply['status'] == 'error':
+        print(f"Error: {reply['message']}")
+    return reply
+
+def _stop_worker(worker):
+    """Close the command stream so the worker exits cleanly"""
+    try:
+        worker.stdin.close()
+    except BrokenPipeError:
+        pass
+    worker.wait()
+
 def run_demo():
     """Run demonstration of different eye detection modes"""
     
@@ -22,6 +75,14 @@ def run_demo():
         print("Error: eye_detection_script.py not found!")
         return
     
+    worker = _start_worker()
+    try:
+        _demo_menu(worker)
+    finally:
+        _stop_worker(worker)
+
+def _demo_menu(worker):
+    """Interactive menu loop; every selection is executed by the shared worker process"""
     print("Available demo modes:")
     print("1. Camera/Webcam detection (real-time)")
     print("2. Image processing")
@@ -37,14 +98,13 @@ def run_demo():
                 print("\nStarting camera detection...")
                 print("Note: This will open your webcam. Press 'q' to quit.")
                 input("Press Enter to continue or Ctrl+C to cancel...")
-                try:
-                    subprocess.run([sys.executable, 'eye_detection_script.py', '--mode', 'camera'])
-                except KeyboardInterrupt:
+                reply = _run_in_worker(worker, mode='camera')
+                if reply and reply['status'] == 'interrupted':
                     print("Camera detection cancelled.")
             
             elif choice == '2':
                 # List available images
-                image_files = [f for f in os.listdir('.') if f.lower().endswith(('.jpg', '.jpeg', '.png'))]
+                image_files = _scan_media(IMAGE_EXTENSIONS)
                 if image_files:
                     print("\nAvailable images:")
                     for i, img in enumerate(image_files, 1):
@@ -55,8 +115,7 @@ def run_demo():
                         if 0 <= img_choice < len(image_files):
                             selected_image = image_files[img_choice]
                             print(f"\nProcessing image: {selected_image}")
-                            subprocess.run([sys.executable, 'eye_detection_script.py', 
-                                          '--mode', 'image', '--input', selected_image])
+                            _run_in_worker(worker, mode='image', input=selected_image)
                         else:
                             print("Invalid selection!")
                     except ValueError:
@@ -65,12 +124,11 @@ def run_demo():
                     print("No image files found in current directory.")
                     custom_path = input("Enter image path (or press Enter to skip): ").strip()
                     if custom_path and os.path.exists(custom_path):
-                        subprocess.run([sys.executable, 'eye_detection_script.py', 
-                                      '--mode', 'image', '--input', custom_path])
+                        _run_in_worker(worker, mode='image', input=custom_path)
             
             elif choice == '3':
                 # List available video files
-                video_files = [f for f in os.listdir('.') if f.lower().endswith(('.mp4', '.avi', '.mov', '.mkv'))]
+                video_files = _scan_media(VIDEO_EXTENSIONS)
                 if video_files:
                     print("\nAvailable videos:")
                     for i, vid in enumerate(video_files, 1):
@@ -81,8 +139,7 @@ def run_demo():
                         if 0 <= vid_choice < len(video_files):
                             selected_video = video_files[vid_choice]
                             print(f"\nProcessing video: {selected_video}")
-                            subprocess.run([sys.executable, 'eye_detection_script.py', 
-                                          '--mode', 'video', '--input', selected_video])
+                            _run_in_worker(worker, mode='video', input=selected_video)
                         else:
                             print("Invalid selection!")
                     except ValueError:
@@ -91,8 +148,7 @@ def run_demo():
                     print("No video files found in current directory.")
                     custom_path = input("Enter video path (or press Enter to skip): ").strip()
                     if custom_path and os.path.exists(custom_path):
-                        subprocess.run([sys.executable, 'eye_detection_script.py', 
-                                      '--mode', 'video', '--input', custom_path])
+                        _run_in_worker(worker, mode='video', input=custom_path)
             
             elif choice == '4':
                 show_usage_examples()
@@ -120,19 +176,31 @@ def show_usage_examples():
     print("2. Image Processing:")
     print("   python eye_detection_script.py --mode image --input photo.jpg")
     print("   python eye_detection_script.py --mode image --input photo.jpg --output result.jpg")
+    print("   python eye_detection_script.py --mode image --input-dir photos/ --output results/ --headless")
     print()
     print("3. Video Processing:")
     print("   python eye_detection_script.py --mode video --input video.mp4")
     print("   python eye_detection_script.py --mode video --input video.mp4 --output output.mp4")
     print("   python eye_detection_script.py --mode video --input video.mp4 --no-save")
+    print("   python eye_detection_script.py --mode video --input video.mp4 --sample-every 3")
     print()
     print("Parameters:")
     print("  --mode: camera, video, or image")
     print("  --input: input file path (required for video/image)")
+    print("  --input-dir: process every image in a directory (image mode)")
+    print("  --headless: don't open result windows (image mode)")
     print("  --output: output file path (optional)")
     print("  --threshold: EAR threshold (default: 0.2)")
     print("  --camera-index: camera index (default: 0)")
+    print("  --no-mirror: don't mirror the camera preview")
     print("  --no-save: don't save output video")
+    print("  --verbose: print per-frame detection status")
+    print("  --no-display: process video without the preview window")
+    print("  --cv-threads: OpenCV thread budget (default: half of the CPU cores)")
+    print("  --server: keep the detector loaded and read JSON commands from stdin")
+    print("  --sample-every: run detection on every K-th video frame (default: FPS/10)")
+    print("  --motion-threshold: reuse the last video detection on static frames, 0 disables (default: 2.0)")
+    print("  --adaptive-stride: detect every N-th video frame while faces stay awake, 1 disables (default: 5)")
     print()
     print("Interactive controls (camera/video modes):")
     print("  'q' - Quit")
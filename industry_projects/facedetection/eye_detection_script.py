@@ -10,36 +10,229 @@ Usage:
     python eye_detection_script.py --mode camera                    # Use webcam
     python eye_detection_script.py --mode video --input video.mp4   # Process video file
     python eye_detection_script.py --mode image --input image.jpg   # Process image
+    python eye_detection_script.py --mode image --input-dir imgs/ --headless  # Batch images
+    python eye_detection_script.py --server                         # Serve JSON commands on stdin
 """
 
 import cv2
+import numpy as np
 import argparse
+import collections
+import contextlib
+import functools
+import json
+import math
 import os
+import queue
+import shutil
+import subprocess
 import sys
+import threading
+import time
 from eyelibuz.eye_openness import EyeOpennessDetector
 
+# Eye-state sampling rate for video mode; blinks last ~100-300 ms so 10 FPS is enough
+TARGET_SAMPLE_FPS = 10
+# Bounded queue depth between the reader, detector and writer stages
+PREFETCH_FRAMES = 4
+# Grayscale difference (0-255) below which a video frame reuses the previous detection: the mean
+# over a 64x48 thumbnail of the frame and the largest cell of a 16x16 grid over each cached face box
+MOTION_THRESHOLD = 2.0
+MOTION_THUMB_SIZE = (64, 48)
+FACE_THUMB_SIZE = (16, 16)
+# A gated detection is reused for at most this many consecutive frames
+MOTION_GATE_MAX_SKIP = 5
+# Adaptive sampling: once the last STEADY_WINDOW detections all show open eyes with an EAR
+# variance below STEADY_EAR_VARIANCE, detect only every ADAPTIVE_STRIDE-th frame
+ADAPTIVE_STRIDE = 5
+STEADY_WINDOW = 30
+STEADY_EAR_VARIANCE = 0.001
+# Frames between refreshes of the statistics overlay text when the other numbers are unchanged
+STATS_REFRESH_FRAMES = 10
+# Minimum seconds between progress line updates in video mode
+PROGRESS_INTERVAL = 0.25
+# Video frames wider than this are downscaled for detection (the output keeps the source size)
+MAX_INFERENCE_WIDTH = 1024
+# Frames wider than this are downscaled for the preview window
+DISPLAY_MAX_WIDTH = 1024
+VIDEO_WINDOW = 'Eye Openness Detection - Video'
+# Image mode output
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+JPEG_QUALITY = 85
+# Encoders tried (in order) when frames are piped to an ffmpeg subprocess, each with a preset it accepts
+FFMPEG_ENCODERS = (('h264_nvenc', 'p4'), ('libx264', 'veryfast'))
+
+
+class _CameraGrabber:
+    """Capture thread that continuously drains a camera and keeps only the latest frame"""
+    
+    def __init__(self, cap, timeout=1.0):
+        self.cap = cap
+        self.timeout = timeout
+        self.ok, self.frame = cap.read()
+        self.seq = 1 if self.ok else 0
+        self.last_seq = 0
+        self.cond = threading.Condition()
+        self.running = self.ok
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+    
+    def start(self):
+        """Start the capture thread"""
+        self.thread.start()
+        return self
+    
+    def _loop(self):
+        """Read frames in a tight loop so the driver buffer never fills up"""
+        while self.running:
+            ok, frame = self.cap.read()
+            with self.cond:
+                self.ok = ok
+                if ok:
+                    self.frame = frame
+                    self.seq += 1
+                else:
+                    self.running = False
+                self.cond.notify_all()
+    
+    def read(self):
+        """Return (ret, frame) with the first frame newer than the previous read
+        
+        Waits up to `timeout` seconds for the camera to deliver it. cap.read() allocates a
+        new array per frame and each frame is handed out once, so no copy is needed.
+        """
+        with self.cond:
+            self.cond.wait_for(lambda: self.seq > self.last_seq or not self.running,
+                               timeout=self.timeout)
+            if self.seq == self.last_seq or self.frame is None:
+                return False, None
+            self.last_seq = self.seq
+            return True, self.frame
+    
+    def stop(self):
+        """Stop the capture thread before the VideoCapture is released"""
+        self.running = False
+        self.thread.join(timeout=1.0)
+
+
+@functools.lru_cache(maxsize=None)
+def _probe_ffmpeg_encoder():
+    """Return the first (codec, preset) in FFMPEG_ENCODERS that ffmpeg can actually encode with, or None"""
+    for codec, preset in FFMPEG_ENCODERS:
+        try:
+            probe = subprocess.run(
+                ['ffmpeg', '-hide_banner', '-loglevel', 'error',
+                 '-f', 'lavfi', '-i', 'color=black:size=256x256', '-frames:v', '1',
+                 '-c:v', codec, '-preset', preset, '-pix_fmt', 'yuv420p', '-f', 'null', '-'],
+                stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=10)
+        except (OSError, subprocess.TimeoutExpired):
+            continue
+        if probe.returncode == 0:
+            return codec, preset
+    return None
+
+
+class _FFmpegWriter:
+    """VideoWriter-compatible sink that pipes raw BGR frames into an ffmpeg subprocess"""
+    
+    def __init__(self, output_path, fps, frame_size, codec, preset):
+        width, height = frame_size
+        self.proc = subprocess.Popen(
+            ['ffmpeg', '-y', '-loglevel', 'error',
+             '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f'{width}x{height}', '-r', str(fps),
+             '-i', '-', '-c:v', codec, '-preset', preset, '-pix_fmt', 'yuv420p', output_path],
+            stdin=subprocess.PIPE)
+    
+    def isOpened(self):
+        """Return True while the ffmpeg process is running"""
+        return self.proc.poll() is None
+    
+    def write(self, frame):
+        """Send one BGR frame to ffmpeg's stdin; raises RuntimeError once the encoder has exited"""
+        if not self.isOpened():
+            raise RuntimeError(f"ffmpeg encoder exited unexpectedly (status {self.proc.returncode})")
+        try:
+            self.proc.stdin.write(frame.tobytes())
+        except OSError:
+            raise RuntimeError(f"ffmpeg encoder exited unexpectedly (status {self.proc.poll()})")
+    
+    def release(self):
+        """Close stdin and wait for ffmpeg to finalize the file; raises RuntimeError if it failed"""
+        try:
+            self.proc.stdin.close()
+        except OSError:
+            pass
+        if self.proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg exited with status {self.proc.returncode}")
+
+
+def _open_video_writer(output_path, fps, frame_size):
+    """
+    Open an output video writer, preferring hardware H.264 encoding
+    
+    Tries OpenCV's FFmpeg backend with hardware acceleration, then an ffmpeg subprocess
+    with the first encoder that passes a probe, and finally falls back to the CPU mp4v encoder.
+    """
+    if hasattr(cv2, 'VIDEOWRITER_PROP_HW_ACCELERATION'):
+        out = cv2.VideoWriter(output_path, cv2.CAP_FFMPEG, cv2.VideoWriter_fourcc(*'avc1'), fps, frame_size,
+                              [cv2.VIDEOWRITER_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY])
+        if out.isOpened():
+            print("Encoder: OpenCV FFmpeg backend (avc1, hardware acceleration)")
+            return out
+        out.release()
+    
+    encoder = _probe_ffmpeg_encoder() if shutil.which('ffmpeg') else None
+    if encoder is not None:
+        codec, preset = encoder
+        print(f"Encoder: ffmpeg subprocess ({codec})")
+        return _FFmpegWriter(output_path, fps, frame_size, codec, preset)
+    
+    print("Encoder: OpenCV mp4v (CPU)")
+    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+    return cv2.VideoWriter(output_path, fourcc, fps, frame_size)
+
 
 class EyeDetectionApp:
-    def __init__(self, ear_threshold=0.15, max_num_faces=5):
+    def __init__(self, ear_threshold=0.15, max_num_faces=5, verbose=False, display=True, cv_threads=None):
         """
         Initialize the Eye Detection Application
         
         Args:
             ear_threshold (float): Eye Aspect Ratio threshold for determining eye openness
             max_num_faces (int): Maximum number of faces to detect simultaneously
+            verbose (bool): Print per-frame status in camera/video modes
+            display (bool): Show the preview window in video mode
+            cv_threads (int): OpenCV thread budget (default: half of the CPU cores)
         """
+        # Leave the remaining cores to MediaPipe's own thread pool instead of oversubscribing
+        if cv_threads is None:
+            cv_threads = max(1, (os.cpu_count() or 2) // 2)
+        cv2.setNumThreads(cv_threads)
+        
         self.detector = EyeOpennessDetector(ear_threshold=ear_threshold, max_num_faces=max_num_faces)
         self.frame_count = 0
         self.total_face_detections = 0
         self.awake_face_detections = 0
         self.closed_face_detections = 0
+        self.verbose = verbose
+        self.display_enabled = display
         
-    def process_camera(self, camera_index=0):
+        # Cached statistics overlay (see _add_statistics)
+        self._stats_sprite = None
+        self._stats_mask = None
+        self._stats_baseline = 0
+        self._stats_sprite_frame = 0
+        self._last_stats_key = None
+        
+        # Per-video detection state (motion gate and adaptive stride)
+        self._reset_video_state()
+        
+    def process_camera(self, camera_index=0, mirror=True):
         """
         Process real-time camera feed for eye openness detection
         
         Args:
             camera_index (int): Camera index (default: 0 for default camera)
+            mirror (bool): Show the preview mirrored (detection always runs on the raw frame)
         """
         print("Starting camera-based eye openness detection...")
         print("Controls:")
@@ -60,69 +253,83 @@ class EyeDetectionApp:
         cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
         cap.set(cv2.CAP_PROP_FPS, 30)
         
+        # Keep the driver queue shallow so we always process the freshest exposure
+        if not cap.set(cv2.CAP_PROP_BUFFERSIZE, 1):
+            print("Warning: camera backend ignored CAP_PROP_BUFFERSIZE")
+        
+        # Many backends ignore the hint above, so drain the camera from a dedicated thread
+        grabber = _CameraGrabber(cap).start()
+        
         paused = False
         
-        while True:
-            if not paused:
-                ret, frame = cap.read()
-                if not ret:
-                    print("Error: Could not read frame from camera")
-                    break
+        try:
+            while True:
+                if not paused:
+                    ret, frame = grabber.read()
+                    if not ret:
+                        print("Error: Could not read frame from camera")
+                        break
                 
-                # Flip frame horizontally for mirror effect
-                frame = cv2.flip(frame, 1)
+                    # Detect eye openness (on the unmirrored frame; EAR is symmetric)
+                    result = self.detector.detect_eye_openness(frame)
                 
-                # Detect eye openness
-                result = self.detector.detect_eye_openness(frame)
+                    # Update statistics
+                    self.frame_count += 1
+                    if result['faces_detected'] > 0:
+                        for face_data in result['faces_data']:
+                            self.total_face_detections += 1
+                            if face_data['both_eyes_open']:
+                                self.awake_face_detections += 1
+                            else:
+                                self.closed_face_detections += 1
                 
-                # Update statistics
-                self.frame_count += 1
-                if result['faces_detected'] > 0:
-                    for face_data in result['faces_data']:
-                        self.total_face_detections += 1
-                        if face_data['both_eyes_open']:
-                            self.awake_face_detections += 1
-                        else:
-                            self.closed_face_detections += 1
+                    # Flip horizontally for the mirror effect at display time only
+                    annotated_frame = result['annotated_image']
+                    if mirror:
+                        annotated_frame = cv2.flip(annotated_frame, 1)
                 
-                # Add statistics to the frame
-                annotated_frame = self._add_statistics(result['annotated_image'], result['faces_detected'])
+                    # Add statistics to the frame
+                    annotated_frame = self._add_statistics(annotated_frame, result['faces_detected'])
                 
-                # Display the frame
-                cv2.imshow('Eye Openness Detection - Camera', annotated_frame)
+                    # Display the frame
+                    cv2.imshow('Eye Openness Detection - Camera', annotated_frame)
                 
-                # Print real-time status
-                if result['faces_detected'] > 0:
-                    print(f"Frame {self.frame_count}: {result['faces_detected']} face(s) detected")
-                    for face_data in result['faces_data']:
-                        face_id = face_data['face_id']
-                        status = "AWAKE" if face_data['both_eyes_open'] else "CLOSED/BLINKING"
-                        print(f"  Face {face_id}: {status} | L_EAR: {face_data['left_ear']:.3f} | R_EAR: {face_data['right_ear']:.3f}")
-                else:
-                    print(f"Frame {self.frame_count}: No faces detected")
+                    # Print real-time status
+                    if self.verbose:
+                        if result['faces_detected'] > 0:
+                            print(f"Frame {self.frame_count}: {result['faces_detected']} face(s) detected")
+                            for face_data in result['faces_data']:
+                                face_id = face_data['face_id']
+                                status = "AWAKE" if face_data['both_eyes_open'] else "CLOSED/BLINKING"
+                                print(f"  Face {face_id}: {status} | L_EAR: {face_data['left_ear']:.3f} | R_EAR: {face_data['right_ear']:.3f}")
+                        else:
+                            print(f"Frame {self.frame_count}: No faces detected")
             
-            # Handle key presses
-            key = cv2.waitKey(1) & 0xFF
-            if key == ord('q'):
-                break
-            elif key == ord('s'):
-                if 'result' in locals():
-                    filename = f'camera_frame_{self.frame_count}.jpg'
-                    cv2.imwrite(filename, result['annotated_image'])
-                    print(f"Frame saved as '{filename}'")
-            elif key == ord('r'):
-                self._reset_statistics()
-                print("Statistics reset")
-            elif key == ord(' '):
-                paused = not paused
-                print("Paused" if paused else "Resumed")
+                # Handle key presses
+                key = cv2.waitKey(1) & 0xFF
+                if key == ord('q'):
+                    break
+                elif key == ord('s'):
+                    if 'result' in locals():
+                        filename = f'camera_frame_{self.frame_count}.jpg'
+                        cv2.imwrite(filename, result['annotated_image'])
+                        print(f"Frame saved as '{filename}'")
+                elif key == ord('r'):
+                    self._reset_statistics()
+                    print("Statistics reset")
+                elif key == ord(' '):
+                    paused = not paused
+                    print("Paused" if paused else "Resumed")
+        finally:
+            # Clean up (also on Ctrl+C, which the --server worker survives)
+            grabber.stop()
+            cap.release()
+            cv2.destroyAllWindows()
         
-        # Clean up
-        cap.release()
-        cv2.destroyAllWindows()
         self._print_final_statistics()
     
-    def process_video(self, video_path, output_path=None, save_output=True):
+    def process_video(self, video_path, output_path=None, save_output=True, sample_every=None,
+                      motion_threshold=MOTION_THRESHOLD, adaptive_stride=ADAPTIVE_STRIDE):
         """
         Process video file for eye openness detection
         
@@ -130,6 +337,11 @@ class EyeDetectionApp:
             video_path (str): Path to input video file
             output_path (str): Path for output video (optional)
             save_output (bool): Whether to save the processed video
+            sample_every (int): Run detection on every K-th frame only (default: derived from FPS)
+            motion_threshold (float): Reuse the previous detection while the mean thumbnail
+                difference stays below this value (0 disables the gate)
+            adaptive_stride (int): Detect only every N-th sampled frame while all faces are
+                steadily awake (1 disables adaptive sampling)
         """
         if not os.path.exists(video_path):
             print(f"Error: Video file '{video_path}' not found")
@@ -152,6 +364,21 @@ class EyeDetectionApp:
         
         print(f"Video properties: {width}x{height}, {fps} FPS, {total_frames} frames")
         
+        # Skipped frames are only grabbed, never decoded to BGR
+        if sample_every is None:
+            sample_every = max(1, round(fps / TARGET_SAMPLE_FPS))
+        sample_every = max(1, sample_every)
+        expected_frames = math.ceil(total_frames / sample_every)
+        if sample_every > 1:
+            print(f"Sampling every {sample_every} frame(s) ({fps / sample_every:.1f} FPS)")
+        
+        # Large frames are downscaled for inference only; detection cost scales with area
+        infer_size = (width, height)
+        if width > MAX_INFERENCE_WIDTH:
+            scale = MAX_INFERENCE_WIDTH / width
+            infer_size = (MAX_INFERENCE_WIDTH, int(round(height * scale)))
+            print(f"Running detection at {infer_size[0]}x{infer_size[1]}")
+        
         # Setup output video writer if saving
         out = None
         if save_output:
@@ -159,85 +386,125 @@ class EyeDetectionApp:
                 base_name = os.path.splitext(os.path.basename(video_path))[0]
                 output_path = f"{base_name}_eye_detection.mp4"
             
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
+            out = _open_video_writer(output_path, fps / sample_every, (width, height))
+            if not out.isOpened():
+                print(f"Error: Could not open output video '{output_path}'")
+                cap.release()
+                return
             print(f"Output will be saved to: {output_path}")
         
         print("\nProcessing frames...")
-        print("Press 'q' to quit, SPACE to pause/resume")
+        if self.display_enabled:
+            print("Press 'q' to quit, SPACE to pause/resume")
         
-        paused = False
+        # Three-stage pipeline: reader thread -> detector (this thread) -> writer thread.
+        # The MediaPipe graph is stateful, so detection stays on the calling thread.
+        read_q = queue.Queue(maxsize=PREFETCH_FRAMES)
+        write_q = queue.Queue(maxsize=PREFETCH_FRAMES)
+        stop_event = threading.Event()
+        pause_event = threading.Event()
+        
+        # Set by the writer thread if the encoder fails mid-video
+        self._write_error = None
+        
+        reader = threading.Thread(target=self._video_reader,
+                                  args=(cap, sample_every, read_q, stop_event), daemon=True)
+        writer = threading.Thread(target=self._video_writer,
+                                  args=(out, write_q, stop_event, pause_event), daemon=True)
+        reader.start()
+        writer.start()
+        
+        last_progress = 0.0
+        faces_detected = awake_count = 0
+        self._reset_video_state()
         
-        while True:
-            if not paused:
-                ret, frame = cap.read()
-                if not ret:
+        try:
+            while True:
+                frame = self._get_until(read_q, stop_event)
+                if frame is None:
+                    break
+                
+                while pause_event.is_set() and not stop_event.is_set():
+                    stop_event.wait(0.05)
+                if stop_event.is_set():
                     break
                 
                 # Detect eye openness
-                result = self.detector.detect_eye_openness(frame)
+                result = self._detect_video_frame(frame, infer_size, motion_threshold, adaptive_stride)
                 
                 # Update statistics
                 self.frame_count += 1
-                if result['faces_detected'] > 0:
+                faces_detected = result['faces_detected']
+                awake_count = 0
+                if faces_detected > 0:
                     for face_data in result['faces_data']:
                         self.total_face_detections += 1
                         if face_data['both_eyes_open']:
                             self.awake_face_detections += 1
+                            awake_count += 1
                         else:
                             self.closed_face_detections += 1
                 
                 # Add statistics to the frame
-                annotated_frame = self._add_statistics(result['annotated_image'], result['faces_detected'])
-                
-                # Save frame to output video
-                if out is not None:
-                    out.write(annotated_frame)
+                annotated_frame = self._add_statistics(result['annotated_image'], faces_detected)
                 
-                # Display progress
-                progress = (self.frame_count / total_frames) * 100
-                awake_count = sum(1 for face in result['faces_data'] if face['both_eyes_open'])
-                print(f"\rProgress: {progress:.1f}% | Frame {self.frame_count}/{total_frames} | "
-                      f"Faces: {result['faces_detected']} | Awake: {awake_count}", end='')
+                # Hand the frame over to the writer thread; ownership moves with it. Every result
+                # carries its own image (the decoded frame with the detector's overlay pasted on),
+                # so a preallocated output ring would only add a full-frame copy
+                self._put_until(write_q, annotated_frame, stop_event)
                 
-                # Display the frame (resize for display if too large)
-                display_frame = annotated_frame
-                if width > 1024:
-                    scale = 1024 / width
-                    new_width = int(width * scale)
-                    new_height = int(height * scale)
-                    display_frame = cv2.resize(annotated_frame, (new_width, new_height))
-                
-                cv2.imshow('Eye Openness Detection - Video', display_frame)
-            
-            # Handle key presses
-            key = cv2.waitKey(1) & 0xFF
-            if key == ord('q'):
-                break
-            elif key == ord(' '):
-                paused = not paused
-                print(f"\n{'Paused' if paused else 'Resumed'}")
+                # Display progress (rate-limited to keep terminal writes off the hot path)
+                now = time.monotonic()
+                if self.verbose or now - last_progress > PROGRESS_INTERVAL:
+                    last_progress = now
+                    self._write_progress(expected_frames, faces_detected, awake_count)
+        finally:
+            # Drain the writer before releasing the capture and the output file; a writer that
+            # died on an error no longer consumes the queue, so never block on a full one
+            while writer.is_alive():
+                try:
+                    write_q.put(None, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+            writer.join()
+            stop_event.set()
+            reader.join()
         
+        # The rate limit may have skipped the last frames; end on the final count
+        self._write_progress(expected_frames, faces_detected, awake_count)
         print("\nVideo processing complete!")
         
         # Clean up
         cap.release()
+        write_error = self._write_error
         if out is not None:
-            out.release()
-        cv2.destroyAllWindows()
+            try:
+                out.release()
+            except RuntimeError as e:
+                write_error = write_error or e
+        if self.display_enabled:
+            cv2.destroyAllWindows()
         
         self._print_final_statistics()
         
+        if write_error is not None:
+            raise RuntimeError(f"Video output failed: {write_error}") from write_error
+        
         if save_output and output_path:
-            print(f"Processed video saved as: {output_path}")
+            if not os.path.exists(output_path):
+                print(f"Error: No output video was written to '{output_path}'")
+            else:
+                print(f"Processed video saved as: {output_path}")
     
-    def process_image(self, image_path, output_path=None):
+    def process_image(self, image_path, output_path=None, headless=False):
         """
         Process static image for eye openness detection
         
         Args:
             image_path (str): Path to input image
             output_path (str): Path for output image (optional)
+            headless (bool): Skip the result window (no imshow/waitKey)
         """
         if not os.path.exists(image_path):
             print(f"Error: Image file '{image_path}' not found")
@@ -259,6 +526,7 @@ class EyeDetectionApp:
         if result['faces_detected'] > 0:
             print(f"Faces detected: {result['faces_detected']}")
             
+            awake_faces = 0
             for face_data in result['faces_data']:
                 face_id = face_data['face_id']
                 print(f"\n--- Face {face_id} ---")
@@ -269,6 +537,7 @@ class EyeDetectionApp:
                 # Determine status for this face
                 if face_data['both_eyes_open']:
                     status = "AWAKE/ALERT"
+                    awake_faces += 1
                 elif face_data['left_eye_open'] or face_data['right_eye_open']:
                     status = "BLINKING/WINKING"
                 else:
@@ -276,7 +545,6 @@ class EyeDetectionApp:
                 print(f"Status: {status}")
             
             # Overall summary
-            awake_faces = sum(1 for face in result['faces_data'] if face['both_eyes_open'])
             print(f"\n=== Summary ===")
             print(f"Total faces: {result['faces_detected']}")
             print(f"Awake faces: {awake_faces}")
@@ -289,8 +557,11 @@ class EyeDetectionApp:
             base_name = os.path.splitext(os.path.basename(image_path))[0]
             output_path = f"{base_name}_eye_detection.jpg"
         
-        cv2.imwrite(output_path, result['annotated_image'])
-        print(f"Result saved as: {output_path}")
+        if self._write_image(output_path, result['annotated_image']):
+            print(f"Result saved as: {output_path}")
+        
+        if headless:
+            return
         
         # Display image
         print("\nPress any key to close the image window")
@@ -298,21 +569,348 @@ class EyeDetectionApp:
         cv2.waitKey(0)
         cv2.destroyAllWindows()
     
+    def process_directory(self, input_dir, output_dir=None, headless=False):
+        """
+        Process every image in a directory with the same detector instance
+        
+        Args:
+            input_dir (str): Directory containing input images
+            output_dir (str): Directory for output images (optional, default: current directory)
+            headless (bool): Skip the result window for each image
+        """
+        if not os.path.isdir(input_dir):
+            print(f"Error: Input directory '{input_dir}' not found")
+            return
+        
+        with os.scandir(input_dir) as it:
+            image_paths = sorted(e.path for e in it
+                                 if e.is_file() and e.name.lower().endswith(IMAGE_EXTENSIONS))
+        if not image_paths:
+            print(f"No images found in '{input_dir}'")
+            return
+        
+        if output_dir is not None:
+            os.makedirs(output_dir, exist_ok=True)
+        
+        print(f"Processing {len(image_paths)} image(s) from: {input_dir}")
+        for image_path in image_paths:
+            output_path = None
+            if output_dir is not None:
+                base_name = os.path.splitext(os.path.basename(image_path))[0]
+                output_path = os.path.join(output_dir, f"{base_name}_eye_detection.jpg")
+            self.process_image(image_path, output_path, headless=headless)
+    
+    @staticmethod
+    def _write_image(output_path, image):
+        """Encode in memory and write the bytes directly, avoiding imwrite's per-call codec lookup"""
+        ext = os.path.splitext(output_path)[1].lower() or '.jpg'
+        params = [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY] if ext in ('.jpg', '.jpeg') else []
+        ok, buf = cv2.imencode(ext, image, params)
+        if not ok:
+            print(f"Error: Could not encode image as '{ext}'")
+            return False
+        with open(output_path, 'wb') as f:
+            f.write(buf)
+        return True
+    
+    def _write_progress(self, expected_frames, faces_detected, awake_count):
+        """Overwrite the progress line in place"""
+        progress = (self.frame_count / max(expected_frames, 1)) * 100
+        sys.stdout.write(f"\rProgress: {progress:.1f}% | Frame {self.frame_count}/{expected_frames} | "
+                         f"Faces: {faces_detected} | Awake: {awake_count}")
+        sys.stdout.flush()
+    
+    def _reset_video_state(self):
+        """Forget cached detections and steady-state history between videos"""
+        self._prev_thumb = None
+        self._prev_patches = []
+        self._gated_frames = 0
+        self._cached_result = None
+        self._cached_overlay = None
+        self._stride = 1
+        self._frames_since_detect = 0
+        self._detections_since_check = 0
+        self._ear_history = collections.deque(maxlen=STEADY_WINDOW)
+        self._open_history = collections.deque(maxlen=STEADY_WINDOW)
+    
+    def _detect_video_frame(self, frame, infer_size, motion_threshold, adaptive_stride):
+        """Detect eye openness for one video frame, skipping inference while all faces are steadily awake"""
+        self._frames_since_detect += 1
+        if self._cached_result is not None and self._frames_since_detect < self._stride:
+            # Draw-only path: reuse the previous detection's overlay on the current frame
+            annotated = self._paste_overlay(frame, self._cached_overlay)
+            return dict(self._cached_result, annotated_image=annotated)
+        
+        self._frames_since_detect = 0
+        result = self._detect_motion_gated(frame, infer_size, motion_threshold)
+        self._update_stride(result, adaptive_stride)
+        return result
+    
+    def _update_stride(self, result, adaptive_stride):
+        """Lower the detection rate once the last STEADY_WINDOW detections show stable open eyes"""
+        faces_data = result['faces_data']
+        all_open = bool(faces_data) and all(face['both_eyes_open'] for face in faces_data)
+        self._open_history.append(all_open)
+        for face_data in faces_data:
+            self._ear_history.append((face_data['left_ear'] + face_data['right_ear']) / 2)
+        
+        if not all_open:
+            # Possible blink or closure: go back to detecting every frame right away
+            self._stride = 1
+            self._detections_since_check = 0
+            return
+        
+        self._detections_since_check += 1
+        if self._detections_since_check >= STEADY_WINDOW:
+            self._detections_since_check = 0
+            steady = (len(self._open_history) == STEADY_WINDOW and all(self._open_history)
+                      and np.var(self._ear_history) < STEADY_EAR_VARIANCE)
+            self._stride = max(1, adaptive_stride) if steady else 1
+    
+    def _detect_motion_gated(self, frame, infer_size, motion_threshold):
+        """Detect eye openness, reusing the last faces while neither the scene nor any face region changed"""
+        if motion_threshold <= 0:
+            result, self._cached_overlay = self._detect_scaled(frame, infer_size)
+            self._cached_result = result
+            return result
+        
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        cached = self._cached_result
+        if cached is not None and self._gated_frames < MOTION_GATE_MAX_SKIP:
+            thumb, patches = self._motion_signature(gray, cached['faces_data'])
+            # A blink is tiny on the full frame, so the face regions are checked cell by cell
+            static = (np.abs(thumb - self._prev_thumb).mean() < motion_threshold
+                      and all(patch is None or np.abs(patch - prev).max() < motion_threshold
+                              for patch, prev in zip(patches, self._prev_patches)))
+            if static:
+                self._gated_frames += 1
+                # Paste the cached overlay on the current frame rather than repeating the old image
+                annotated = self._paste_overlay(frame, self._cached_overlay)
+                return dict(cached, annotated_image=annotated)
+        
+        result, self._cached_overlay = self._detect_scaled(frame, infer_size)
+        self._cached_result = result
+        self._gated_frames = 0
+        self._prev_thumb, self._prev_patches = self._motion_signature(gray, result['faces_data'])
+        return result
+    
+    @staticmethod
+    def _motion_signature(gray, faces_data):
+        """Whole-frame thumbnail plus a FACE_THUMB_SIZE grid of cell means over each face box"""
+        thumb = cv2.resize(gray, MOTION_THUMB_SIZE, interpolation=cv2.INTER_AREA).astype(np.int16)
+        height, width = gray.shape
+        patches = []
+        for face_data in faces_data:
+            x1, y1, x2, y2 = face_data['bbox']
+            x1, y1 = max(0, int(x1)), max(0, int(y1))
+            x2, y2 = min(width, int(x2)), min(height, int(y2))
+            if x2 <= x1 or y2 <= y1:
+                patches.append(None)
+                continue
+            patches.append(cv2.resize(gray[y1:y2, x1:x2], FACE_THUMB_SIZE,
+                                      interpolation=cv2.INTER_AREA).astype(np.int16))
+        return thumb, patches
+    
+    def _detect_scaled(self, frame, infer_size):
+        """Detect on a copy of frame at infer_size and map the results back onto the full-size frame
+        
+        Returns (result, overlay). Every output frame, detected or reused, is rendered the same
+        way: the current frame with the detector's overlay pasted on, so the drawing never flickers.
+        """
+        height, width = frame.shape[:2]
+        scaled = (width, height) != infer_size
+        # The detector gets a private input so whatever it draws can be told apart from the frame
+        small = cv2.resize(frame, infer_size, interpolation=cv2.INTER_AREA) if scaled else frame.copy()
+        result = self.detector.detect_eye_openness(small)
+        annotated = result['annotated_image']
+        if np.shares_memory(annotated, small):
+            small = cv2.resize(frame, infer_size, interpolation=cv2.INTER_AREA) if scaled else frame
+        overlay = self._extract_overlay(annotated, small, (width, height))
+        
+        faces_data = result['faces_data']
+        if scaled:
+            sx, sy = width / infer_size[0], height / infer_size[1]
+            faces_data = []
+            for face_data in result['faces_data']:
+                x1, y1, x2, y2 = face_data['bbox']
+                faces_data.append(dict(face_data, bbox=(x1 * sx, y1 * sy, x2 * sx, y2 * sy)))
+        
+        annotated = self._paste_overlay(frame, overlay)
+        return dict(result, faces_data=faces_data, annotated_image=annotated), overlay
+    
+    @staticmethod
+    def _extract_overlay(annotated, reference, frame_size):
+        """Crop what the detector drew (pixels differing from its input) and scale it to frame_size
+        
+        Returns (x0, y0, pixels, mask) in frame coordinates, or None when nothing was drawn.
+        """
+        mask = np.any(annotated != reference, axis=2)
+        rows = np.flatnonzero(mask.any(axis=1))
+        if rows.size == 0:
+            return None
+        cols = np.flatnonzero(mask.any(axis=0))
+        y0, y1, x0, x1 = rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+        pixels, mask = annotated[y0:y1, x0:x1], mask[y0:y1, x0:x1]
+        
+        height, width = annotated.shape[:2]
+        if (width, height) != frame_size:
+            sx, sy = frame_size[0] / width, frame_size[1] / height
+            x0, y0 = int(x0 * sx), int(y0 * sy)
+            x1 = min(frame_size[0], int(np.ceil(x1 * sx)))
+            y1 = min(frame_size[1], int(np.ceil(y1 * sy)))
+            pixels = cv2.resize(pixels, (x1 - x0, y1 - y0), interpolation=cv2.INTER_LINEAR)
+            mask = cv2.resize(mask.astype(np.uint8), (x1 - x0, y1 - y0),
+                              interpolation=cv2.INTER_NEAREST) > 0
+        return int(x0), int(y0), pixels, mask[..., None]
+    
+    @staticmethod
+    def _paste_overlay(image, overlay):
+        """Copy an overlay from _extract_overlay onto image in place"""
+        if overlay is not None:
+            x0, y0, pixels, mask = overlay
+            height, width = mask.shape[:2]
+            np.copyto(image[y0:y0 + height, x0:x0 + width], pixels, where=mask)
+        return image
+    
+    def _video_reader(self, cap, sample_every, read_q, stop_event):
+        """Reader stage: decode sampled frames into read_q, then push the None sentinel"""
+        while not stop_event.is_set():
+            ret, frame = self._read_sampled(cap, sample_every)
+            if not ret:
+                break
+            self._put_until(read_q, frame, stop_event)
+        self._put_until(read_q, None, stop_event)
+    
+    def _video_writer(self, out, write_q, stop_event, pause_event):
+        """Writer stage: encode and display annotated frames until the None sentinel arrives"""
+        try:
+            if self.display_enabled:
+                cv2.namedWindow(VIDEO_WINDOW)
+            
+            while True:
+                try:
+                    annotated_frame = write_q.get(timeout=0.03)
+                except queue.Empty:
+                    # Keep polling keys while the detector is paused or busy
+                    if self.display_enabled:
+                        self._handle_video_keys(stop_event, pause_event)
+                    continue
+                if annotated_frame is None:
+                    break
+                
+                # Save frame to output video
+                if out is not None:
+                    out.write(annotated_frame)
+                
+                if not self.display_enabled:
+                    continue
+                
+                # Skip the resize entirely while the window is closed or hidden
+                if cv2.getWindowProperty(VIDEO_WINDOW, cv2.WND_PROP_VISIBLE) >= 1:
+                    # Display the frame (resize for display if too large)
+                    display_frame = annotated_frame
+                    width = annotated_frame.shape[1]
+                    if width > DISPLAY_MAX_WIDTH:
+                        scale = DISPLAY_MAX_WIDTH / width
+                        display_frame = cv2.resize(annotated_frame, (0, 0), fx=scale, fy=scale,
+                                                   interpolation=cv2.INTER_AREA)
+                    
+                    cv2.imshow(VIDEO_WINDOW, display_frame)
+                self._handle_video_keys(stop_event, pause_event)
+        except Exception as e:
+            # Encoder gone or no GUI backend: record it for process_video and stop the pipeline
+            self._write_error = e
+            stop_event.set()
+    
+    @staticmethod
+    def _handle_video_keys(stop_event, pause_event):
+        """Handle key presses for video mode: 'q' stops the pipeline, SPACE toggles pause"""
+        key = cv2.waitKey(1) & 0xFF
+        if key == ord('q'):
+            stop_event.set()
+        elif key == ord(' '):
+            if pause_event.is_set():
+                pause_event.clear()
+            else:
+                pause_event.set()
+            print(f"\n{'Paused' if pause_event.is_set() else 'Resumed'}")
+    
+    @staticmethod
+    def _put_until(q, item, stop_event):
+        """Blocking put that gives up once stop_event is set"""
+        while not stop_event.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+    
+    @staticmethod
+    def _get_until(q, stop_event):
+        """Blocking get that returns None once stop_event is set"""
+        while not stop_event.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return None
+    
+    @staticmethod
+    def _read_sampled(cap, sample_every):
+        """Decode the next frame, then grab (without decoding) the following sample_every-1 frames"""
+        if not cap.grab():
+            return False, None
+        ret, frame = cap.retrieve()
+        for _ in range(sample_every - 1):
+            if not cap.grab():
+                break
+        return ret, frame
+    
     def _add_statistics(self, image, faces_detected):
         """Add statistics overlay to the image"""
         if self.frame_count > 0 and self.total_face_detections > 0:
             awake_percentage = (self.awake_face_detections / self.total_face_detections) * 100
-            stats_text = f"Frames: {self.frame_count} | Faces: {faces_detected} | Awake: {awake_percentage:.1f}%"
-            cv2.putText(image, stats_text, (10, image.shape[0] - 20), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+            # Re-rasterize only when the numbers change (the frame counter every few frames)
+            stats_key = (faces_detected, f"{awake_percentage:.1f}")
+            if (self._stats_sprite is None or stats_key != self._last_stats_key
+                    or self.frame_count - self._stats_sprite_frame >= STATS_REFRESH_FRAMES):
+                stats_text = f"Frames: {self.frame_count} | Faces: {faces_detected} | Awake: {awake_percentage:.1f}%"
+                self._render_stats_sprite(stats_text)
+                self._last_stats_key = stats_key
+                self._stats_sprite_frame = self.frame_count
+            self._paste_stats_sprite(image)
         return image
     
+    def _render_stats_sprite(self, stats_text):
+        """Rasterize the statistics text once into a small sprite plus its glyph mask"""
+        (text_w, text_h), baseline = cv2.getTextSize(stats_text, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)
+        sprite = np.zeros((text_h + baseline + 4, text_w + 4, 3), dtype=np.uint8)
+        cv2.putText(sprite, stats_text, (2, text_h + 2),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+        self._stats_sprite = sprite
+        self._stats_mask = sprite[:, :, :1] > 0
+        self._stats_baseline = text_h + 2
+    
+    def _paste_stats_sprite(self, image):
+        """Blit the cached sprite so its text baseline sits 20 px above the bottom edge"""
+        y0 = image.shape[0] - 20 - self._stats_baseline
+        x0 = 8
+        sy = max(0, -y0)
+        sh = min(self._stats_sprite.shape[0], image.shape[0] - y0)
+        sw = min(self._stats_sprite.shape[1], image.shape[1] - x0)
+        if sh <= sy or sw <= 0:
+            return
+        np.copyto(image[y0 + sy:y0 + sh, x0:x0 + sw], self._stats_sprite[sy:sh, :sw],
+                  where=self._stats_mask[sy:sh, :sw])
+    
     def _reset_statistics(self):
         """Reset frame statistics"""
         self.frame_count = 0
         self.total_face_detections = 0
         self.awake_face_detections = 0
         self.closed_face_detections = 0
+        self._stats_sprite = None
     
     def _print_final_statistics(self):
         """Print final processing statistics"""
@@ -326,42 +924,123 @@ class EyeDetectionApp:
             print(f"Average faces per frame: {self.total_face_detections / self.frame_count:.1f}")
 
 
+def run_command(app, command):
+    """
+    Run one detection mode described by a command dict
+    
+    The keys mirror the CLI argument names (mode, input, output, camera_index, no_save, ...),
+    so the same dispatch serves both the command line and --server requests.
+    """
+    mode = command.get('mode')
+    if mode == 'video' and not command.get('input'):
+        raise ValueError("input is required for video mode")
+    if mode == 'image' and not (command.get('input') or command.get('input_dir')):
+        raise ValueError("input or input_dir is required for image mode")
+    
+    if mode == 'camera':
+        app.process_camera(camera_index=command.get('camera_index', 0), mirror=not command.get('no_mirror', False))
+    elif mode == 'video':
+        app.process_video(command['input'], command.get('output'), save_output=not command.get('no_save', False),
+                          sample_every=command.get('sample_every'),
+                          motion_threshold=command.get('motion_threshold', MOTION_THRESHOLD),
+                          adaptive_stride=command.get('adaptive_stride', ADAPTIVE_STRIDE))
+    elif mode == 'image' and command.get('input_dir'):
+        app.process_directory(command['input_dir'], command.get('output'), headless=command.get('headless', False))
+    elif mode == 'image':
+        app.process_image(command['input'], command.get('output'), headless=command.get('headless', False))
+    else:
+        raise ValueError(f"unknown mode '{mode}'")
+
+
+def serve(app):
+    """
+    Serve newline-separated JSON commands from stdin, e.g. {"mode": "image", "input": "photo.jpg"}
+    
+    Each command gets exactly one JSON reply line on stdout ({"status": "ok"} or
+    {"status": "error", "message": ...}); all human-readable output goes to stderr.
+    """
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            command = json.loads(line)
+            with contextlib.redirect_stdout(sys.stderr):
+                app._reset_statistics()
+                run_command(app, command)
+            reply = {"status": "ok"}
+        except KeyboardInterrupt:
+            reply = {"status": "interrupted"}
+        except Exception as e:
+            reply = {"status": "error", "message": str(e)}
+        sys.stdout.write(json.dumps(reply) + "\n")
+        sys.stdout.flush()
+
+
 def main():
     """Main function to handle command line arguments and run the appropriate detection mode"""
     parser = argparse.ArgumentParser(description='Eye Openness Detection Script')
-    parser.add_argument('--mode', choices=['camera', 'video', 'image'], required=True,
+    parser.add_argument('--mode', choices=['camera', 'video', 'image'],
                        help='Detection mode: camera (webcam), video (file), or image (static)')
     parser.add_argument('--input', type=str,
                        help='Input file path (required for video and image modes)')
+    parser.add_argument('--input-dir', type=str,
+                       help='Process every image in this directory (image mode)')
     parser.add_argument('--output', type=str,
-                       help='Output file path (optional)')
+                       help='Output file path (optional; output directory with --input-dir)')
     parser.add_argument('--threshold', type=float, default=0.1,
                        help='EAR threshold for eye openness detection (default: 0.1)')
     parser.add_argument('--camera-index', type=int, default=0,
                        help='Camera index for camera mode (default: 0)')
+    parser.add_argument('--no-mirror', action='store_true',
+                       help='Do not mirror the camera preview')
     parser.add_argument('--max-faces', type=int, default=5,
                        help='Maximum number of faces to detect simultaneously (default: 5)')
     parser.add_argument('--no-save', action='store_true',
                        help='Do not save output for video mode')
+    parser.add_argument('--sample-every', type=int, default=None,
+                       help=f'Run detection on every K-th video frame (default: FPS/{TARGET_SAMPLE_FPS})')
+    parser.add_argument('--motion-threshold', type=float, default=MOTION_THRESHOLD,
+                       help=f'Reuse the previous video detection below this frame difference, 0 disables '
+                            f'(default: {MOTION_THRESHOLD})')
+    parser.add_argument('--adaptive-stride', type=int, default=ADAPTIVE_STRIDE,
+                       help=f'Detect every N-th video frame while all faces are steadily awake, 1 disables '
+                            f'(default: {ADAPTIVE_STRIDE})')
+    parser.add_argument('--headless', action='store_true',
+                       help='Do not open result windows in image mode')
+    parser.add_argument('--verbose', action='store_true',
+                       help='Print per-frame detection status')
+    parser.add_argument('--no-display', action='store_true',
+                       help='Do not show the preview window in video mode')
+    parser.add_argument('--cv-threads', type=int, default=None,
+                       help='Threads used by OpenCV routines (default: half of the CPU cores)')
+    parser.add_argument('--server', action='store_true',
+                       help='Keep the detector loaded and read JSON commands from stdin')
     
     args = parser.parse_args()
     
     # Validate arguments
-    if args.mode in ['video', 'image'] and not args.input:
+    if not args.server and args.mode is None:
+        print("Error: --mode is required unless --server is given")
+        sys.exit(1)
+    if args.mode == 'video' and not args.input:
         print(f"Error: --input is required for {args.mode} mode")
         sys.exit(1)
+    if args.mode == 'image' and not (args.input or args.input_dir):
+        print(f"Error: --input or --input-dir is required for {args.mode} mode")
+        sys.exit(1)
     
     # Initialize the application
-    app = EyeDetectionApp(ear_threshold=args.threshold, max_num_faces=args.max_faces)
+    app = EyeDetectionApp(ear_threshold=args.threshold, max_num_faces=args.max_faces,
+                          verbose=args.verbose, display=not args.no_display,
+                          cv_threads=args.cv_threads)
     
     # Run the appropriate mode
     try:
-        if args.mode == 'camera':
-            app.process_camera(camera_index=args.camera_index)
-        elif args.mode == 'video':
-            app.process_video(args.input, args.output, save_output=not args.no_save)
-        elif args.mode == 'image':
-            app.process_image(args.input, args.output)
+        if args.server:
+            serve(app)
+        else:
+            run_command(app, vars(args))
     except KeyboardInterrupt:
         print("\nOperation interrupted by user")
     except Exception as e:
@@ -2,90 +2,164 @@ import cv2
 import numpy as np
 import onnxruntime
 import os
-from scipy.spatial.distance import cosine
 from time import time
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 from ..model_zoo import model_zoo
 from .common import Face
 from eyelibuz.eye_openness import EyeOpennessDetector
+from facelibuz.utils import face_align
 from facelibuz.utils.sort_tracker import SORT
 from facelibuz.utils.trackableobject import TrackableObject
+try:
+    import simsimd
+except ImportError:
+    simsimd = None
 onnxruntime.set_default_logger_severity(3)
 
-# Timer tracking for persons
-PERSON_TIMERS = {}  # {person_name: {'last_seen': timestamp, 'first_seen': timestamp}}
+REC_MODEL_PATH = 'models/l/adaface.onnx'  # a .fp16.onnx sibling is preferred on GPU
+GENDERAGE_MODEL_PATH = 'models/l/genderage.onnx'  # a .fp16.onnx sibling is preferred on GPU
 RESET_THRESHOLD = 10  # seconds - if not seen for this long, reset counter
+GENDERAGE_MAX_BATCH = 16  # faces per gender/age session run
+REC_MAX_BATCH = 16  # faces per recognition session run
+MOTION_GATE_SIZE = (160, 90)  # grayscale thumbnail compared between frames
+MOTION_GATE_THRESHOLD = 2.0  # mean abs pixel difference below this counts as a static frame
+MOTION_GATE_MAX_SKIP = 10  # run the full pipeline at least this often even on a static scene
+TRT_CACHE_DIR = 'models/l/trt_cache'  # serialized TensorRT engines, built on first run
+PASSPORT_CACHE_SIZE = 256  # decoded passport photos kept in memory
+GALLERY_BLOCK = 1024  # gallery rows scored per step in find_face
+EARLY_EXIT_SCORE = 0.8  # a match this strong ends the gallery scan early
+
+
+class PersonTimers:
+    """Visibility timers for persons, one row per name across parallel float64 arrays"""
+
+    def __init__(self, capacity=64):
+        self._idx = {}  # {person_name: row}
+        self._names = []
+        self._first = np.zeros(capacity)
+        self._last = np.zeros(capacity)
+        self._paused_at = np.full(capacity, np.nan)  # NaN - timer running
+
+    def _reset(self, i, current_time):
+        self._first[i] = current_time
+        self._last[i] = current_time
+        self._paused_at[i] = np.nan
+
+    def _add(self, person_name, current_time):
+        i = len(self._names)
+        if i == len(self._first):
+            # grow every column by doubling
+            capacity = max(1, 2 * i)
+            self._first = np.resize(self._first, capacity)
+            self._last = np.resize(self._last, capacity)
+            self._paused_at = np.resize(self._paused_at, capacity)
+        self._idx[person_name] = i
+        self._names.append(person_name)
+        self._reset(i, current_time)
+
+    def update(self, person_name, current_time, is_timer_paused=False):
+        i = self._idx.get(person_name)
+        if i is None:
+            # New person - initialize timer
+            self._add(person_name, current_time)
+            return 0
+
+        # Check if person was absent for more than RESET_THRESHOLD seconds
+        if current_time - self._last[i] > RESET_THRESHOLD:
+            self._reset(i, current_time)
+            return 0
+
+        self._last[i] = current_time
+
+        # Handle timer pause/resume
+        if is_timer_paused:
+            if np.isnan(self._paused_at[i]):
+                self._paused_at[i] = current_time
+            # The dict version's accumulated_time was always 0 here, keep returning that
+            return 0
+
+        if not np.isnan(self._paused_at[i]):
+            # Just resumed, adjust first_seen to account for paused duration
+            self._first[i] += current_time - self._paused_at[i]
+            self._paused_at[i] = np.nan
+
+        # Return current duration
+        return int(current_time - self._first[i])
+
+    def evict_stale(self, current_time):
+        # drop everyone absent for more than RESET_THRESHOLD in one pass over the arrays
+        n = len(self._names)
+        if n == 0:
+            return
+        stale = current_time - self._last[:n] > RESET_THRESHOLD
+        if not stale.any():
+            return
+
+        keep = np.flatnonzero(~stale)
+        k = len(keep)
+        self._first[:k] = self._first[keep]
+        self._last[:k] = self._last[keep]
+        self._paused_at[:k] = self._paused_at[keep]
+        self._names = [self._names[i] for i in keep]
+        self._idx = {name: i for i, name in enumerate(self._names)}
+
+
+# Timer tracking for persons
+PERSON_TIMERS = PersonTimers()
+
+
+def fp16_model_path(model_path):
+    """Return the FP16 variant of an ONNX model (see convert_fp16.py) if it exists and CUDA can run it, else None"""
+    fp16_path = model_path[:-len('.onnx')] + '.fp16.onnx'
+    if os.path.exists(fp16_path) and 'CUDAExecutionProvider' in onnxruntime.get_available_providers():
+        return fp16_path
+    return None
+
 
 def update_person_timer(person_name, current_time, is_timer_paused=False):
     """Update the timer for a person and return the seconds they've been visible"""
-    global PERSON_TIMERS, RESET_THRESHOLD
-    
     if person_name == "unknown" or not person_name:
         return 0
-    
-    if person_name in PERSON_TIMERS:
-        # Check if person was absent for more than RESET_THRESHOLD seconds
-        time_since_last_seen = current_time - PERSON_TIMERS[person_name]['last_seen']
-        
-        if time_since_last_seen > RESET_THRESHOLD:
-            # Reset the timer - person was away too long
-            PERSON_TIMERS[person_name] = {
-                'first_seen': current_time,
-                'last_seen': current_time,
-                'paused_at': None,
-                'accumulated_time': 0
-            }
-            return 0
-        else:
-            # Update last seen time
-            PERSON_TIMERS[person_name]['last_seen'] = current_time
-            
-            # Handle timer pause/resume
-            if is_timer_paused:
-                if PERSON_TIMERS[person_name].get('paused_at') is None:
-                    # Just paused, save the accumulated time
-                    if 'accumulated_time' not in PERSON_TIMERS[person_name]:
-                        PERSON_TIMERS[person_name]['accumulated_time'] = int(current_time - PERSON_TIMERS[person_name]['first_seen'])
-                    PERSON_TIMERS[person_name]['paused_at'] = current_time
-                # Return accumulated time (frozen while paused)
-                return PERSON_TIMERS[person_name].get('accumulated_time', 0)
-            else:
-                if PERSON_TIMERS[person_name].get('paused_at') is not None:
-                    # Just resumed, adjust first_seen to account for paused duration
-                    paused_duration = current_time - PERSON_TIMERS[person_name]['paused_at']
-                    PERSON_TIMERS[person_name]['first_seen'] += paused_duration
-                    PERSON_TIMERS[person_name]['paused_at'] = None
-                
-                # Return current duration
-                return int(current_time - PERSON_TIMERS[person_name]['first_seen'])
-    else:
-        # New person - initialize timer
-        PERSON_TIMERS[person_name] = {
-            'first_seen': current_time,
-            'last_seen': current_time,
-            'paused_at': None,
-            'accumulated_time': 0
-        }
-        return 0
+
+    return PERSON_TIMERS.update(person_name, current_time, is_timer_paused)
 
 
 class FaceAnalysis:
 
     def __init__(self, known_people=None, tracking=False):
         self.det_model = model_zoo.get_model('models/l/det_10g.onnx')
-        self.rec_model = model_zoo.get_model('models/l/adaface.onnx')
+        self.rec_model = model_zoo.get_model(REC_MODEL_PATH)
         self.eye_openness_detector = EyeOpennessDetector(ear_threshold=0.12, max_num_faces=5)
-        self.genderage_model = model_zoo.get_model('models/l/genderage.onnx')
+        self.genderage_model = model_zoo.get_model(GENDERAGE_MODEL_PATH)
 
         self.genders = ["Female", "Male", "None"]
 
+        # reused recognition staging (aligned uint8 crops) and network input buffers
+        rec_size = self.rec_model.input_size[0]
+        self._align_u8 = np.empty((REC_MAX_BATCH, rec_size, rec_size, 3), dtype=np.uint8)
+        self._align_f32 = np.empty((REC_MAX_BATCH, 3, rec_size, rec_size), dtype=np.float32)
+
+        # ORT releases the GIL during Run, so independent models can overlap on threads
+        self._pool = ThreadPoolExecutor(max_workers=4)
+        # MediaPipe graphs are not thread-safe, so eye openness always runs on the same thread
+        self._eye_pool = ThreadPoolExecutor(max_workers=1)
+
         self.known_people=known_people
+        self._build_gallery()
 
         self.tracker = None
 
         self.seen_people = {}
         self.record_people = {}
+        self._passport_cache = OrderedDict()
+        self._eye_boxes_src = None
+        self._eye_boxes = None
+        self._last_frame_time = time()
+        self._prev_small = None
+        self._last_faces = []
+        self._skipped_frames = 0
 
         print("Initialized face analysis")
         print("Tracking: ", tracking)
@@ -95,6 +169,11 @@ class FaceAnalysis:
             self.trackableObjects = OrderedDict()
 
 
+    def close(self):
+        """Shut down the worker threads"""
+        self._pool.shutdown(wait=True)
+        self._eye_pool.shutdown(wait=True)
+
     def prepare(
         self,
         ctx_id,
@@ -106,174 +185,354 @@ class FaceAnalysis:
         self.rec_thresh = rec_thresh
         self.det_size = det_size
 
+        if ctx_id >= 0:
+            # FP16 graphs only pay off on the GPU; the CPU EP lacks many FP16 kernels,
+            # so the FP32 models loaded in __init__ stay in place for ctx_id < 0
+            rec_fp16 = fp16_model_path(REC_MODEL_PATH)
+            if rec_fp16 is not None:
+                self.rec_model = model_zoo.get_model(rec_fp16)
+            genderage_fp16 = fp16_model_path(GENDERAGE_MODEL_PATH)
+            if genderage_fp16 is not None:
+                self.genderage_model = model_zoo.get_model(genderage_fp16)
+
         self.det_model.prepare(ctx_id, input_size=det_size, det_thresh=det_thresh)
         self.rec_model.prepare(ctx_id)
         self.genderage_model.prepare(ctx_id)
 
-    def find_face(self, embedding):
-        best_matches = []
+        if ctx_id >= 0 and 'TensorrtExecutionProvider' in onnxruntime.get_available_providers():
+            # detector always runs one frame at a fixed size and stays FP32 for anchor decoding;
+            # rec/genderage batches vary per frame and tolerate FP16
+            os.makedirs(TRT_CACHE_DIR, exist_ok=True)
+            w, h = det_size
+            det_shape = f'1x3x{h}x{w}'
+            self._use_tensorrt(self.det_model, ctx_id, det_shape, det_shape, det_shape, fp16=False)
+
+            rec_size = self.rec_model.input_size[0]
+            self._use_tensorrt(
+                self.rec_model,
+                ctx_id,
+                f'1x3x{rec_size}x{rec_size}',
+                f'4x3x{rec_size}x{rec_size}',
+                f'{REC_MAX_BATCH}x3x{rec_size}x{rec_size}',
+            )
 
-        for person in self.known_people:
-            score = 1 - cosine(person['embedding'], embedding)
+            ga_size = self.genderage_model.input_size[0]
+            self._use_tensorrt(
+                self.genderage_model,
+                ctx_id,
+                f'1x3x{ga_size}x{ga_size}',
+                f'4x3x{ga_size}x{ga_size}',
+                f'{GENDERAGE_MAX_BATCH}x3x{ga_size}x{ga_size}',
+            )
+            print("TensorRT enabled")
+
+    def _use_tensorrt(self, model, ctx_id, min_shape, opt_shape, max_shape, fp16=True):
+        # engine with one optimization profile over the batch dim, cached on disk;
+        # anything TensorRT can't take falls back to CUDA, then CPU
+        trt_options = {
+            'device_id': ctx_id,
+            'trt_fp16_enable': fp16,
+            'trt_engine_cache_enable': True,
+            'trt_engine_cache_path': TRT_CACHE_DIR,
+            'trt_profile_min_shapes': f'{model.input_name}:{min_shape}',
+            'trt_profile_opt_shapes': f'{model.input_name}:{opt_shape}',
+            'trt_profile_max_shapes': f'{model.input_name}:{max_shape}',
+        }
+        model.session.set_providers(
+            ['TensorrtExecutionProvider', 'CUDAExecutionProvider', 'CPUExecutionProvider'],
+            [trt_options, {'device_id': ctx_id}, {}],
+        )
+
+    def _build_gallery(self):
+        # known embeddings as one L2-normalized FP16 (N, D) matrix + parallel metadata lists
+        people = self.known_people or []
+        self._known_names = [person['name'] for person in people]
+        self._known_pinfl = [person['pinfl'] for person in people]
+        self._known_paths = [person['image_path'] for person in people]
+
+        if people:
+            known = np.stack([np.asarray(person['embedding'], dtype=np.float32).ravel() for person in people])
+            known /= np.linalg.norm(known, axis=1, keepdims=True)
+            self._known_emb = known.astype(np.float16)
+        else:
+            self._known_emb = None
+
+    def _append_to_gallery(self, person):
+        emb = np.asarray(person['embedding'], dtype=np.float32).ravel()
+        emb = (emb / np.linalg.norm(emb))[None].astype(np.float16)
+        self._known_emb = emb if self._known_emb is None else np.vstack([self._known_emb, emb])
+        self._known_names.append(person['name'])
+        self._known_pinfl.append(person['pinfl'])
+        self._known_paths.append(person['image_path'])
+
+    def _best_match(self, q):
+        # scan the gallery block by block, stop as soon as a match is unambiguous
+        best_idx, best_score = -1, -np.inf
+        q16 = q.astype(np.float16)[None]
+        for start in range(0, len(self._known_emb), GALLERY_BLOCK):
+            block = self._known_emb[start:start + GALLERY_BLOCK]
+            if simsimd is not None:
+                # runtime-dispatched AVX2/AVX-512/NEON kernel, f16 in and f32 out; distance is 1 - similarity
+                scores = 1 - np.asarray(simsimd.cdist(block, q16, metric='cosine'), dtype=np.float32).ravel()
+            else:
+                # NumPy has no fast FP16 matmul, so upcast one block at a time
+                scores = block.astype(np.float32) @ q
+
+            i = int(np.argmax(scores))
+            if scores[i] > best_score:
+                best_idx, best_score = start + i, float(scores[i])
+            if best_score >= EARLY_EXIT_SCORE:
+                break
+        return best_idx, best_score
 
-            if(score > self.rec_thresh):
-                known = {}
-                known['name']=person['name']
-                known['score']= round(score, 2)
-                known["pinfl"]=person["pinfl"]
-                known['image_path'] = person['image_path']
-                best_matches.append(known)
+    def find_face(self, embedding):
+        if self._known_emb is None:
+            return None
+
+        q = np.asarray(embedding, dtype=np.float32).ravel()
+        q = q / np.linalg.norm(q)
 
-        if len(best_matches) == 0:
+        idx, score = self._best_match(q)
+        if score <= self.rec_thresh:
             return None
 
-        best_matches.sort(key=lambda x: -x['score'])
+        known = {}
+        known['name'] = self._known_names[idx]
+        known['score'] = round(score, 2)
+        known["pinfl"] = self._known_pinfl[idx]
+        known['image_path'] = self._known_paths[idx]
 
-        return best_matches[0]
+        return known
     
     def match_eye_openness(self, eye_opennesses, bbox):
         if eye_opennesses is None or 'faces_data' not in eye_opennesses:
             return None
-        
+
+        # eye boxes are stacked once per frame and reused for every tracked object
+        if eye_opennesses is not self._eye_boxes_src:
+            self._eye_boxes_src = eye_opennesses
+            self._eye_boxes = np.array(
+                [face_data['bbox'] for face_data in eye_opennesses['faces_data']], dtype=np.float32
+            ).reshape(-1, 4)
+
+        eye_boxes = self._eye_boxes
+        if len(eye_boxes) == 0:
+            return None
+
         x1, y1, x2, y2 = bbox
-        matched_data = None
-        max_iou = 0
-        
-        ious = []
-        for face_data in eye_opennesses['faces_data']:
-            ex1, ey1, ex2, ey2 = face_data['bbox']
-            
-            # Calculate intersection
-            ix1 = max(x1, ex1)
-            iy1 = max(y1, ey1)
-            ix2 = min(x2, ex2)
-            iy2 = min(y2, ey2)
-            
-            if ix1 < ix2 and iy1 < iy2:  # There is an intersection
-                inter_area = (ix2 - ix1) * (iy2 - iy1)
-                box_area = (x2 - x1) * (y2 - y1)
-                bbox_area = (ex2 - ex1) * (ey2 - ey1)
-                iou = inter_area / float(box_area + bbox_area - inter_area)
-                
-                ious.append((iou, face_data))
-        
-        if ious:
-            max_iou_tuple = max(ious, key=lambda x: x[0])
-            max_iou = max_iou_tuple[0]
-            matched_data = max_iou_tuple[1] if max_iou > 0.4 else None
-        
-        return matched_data
+
+        # Calculate intersection with all eye-openness boxes at once
+        ix1 = np.maximum(x1, eye_boxes[:, 0])
+        iy1 = np.maximum(y1, eye_boxes[:, 1])
+        ix2 = np.minimum(x2, eye_boxes[:, 2])
+        iy2 = np.minimum(y2, eye_boxes[:, 3])
+        inter_area = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+
+        box_area = (x2 - x1) * (y2 - y1)
+        bbox_area = (eye_boxes[:, 2] - eye_boxes[:, 0]) * (eye_boxes[:, 3] - eye_boxes[:, 1])
+        iou = inter_area / (box_area + bbox_area - inter_area)
+
+        idx = int(np.argmax(iou))
+        return eye_opennesses['faces_data'][idx] if iou[idx] > 0.4 else None
+
+    def _get_embeddings(self, img, faces):
+        # align every face, then run the recognition session once per chunk of REC_MAX_BATCH
+        if not faces:
+            return
+        model = self.rec_model
+        input_size = model.input_size[0]
+        for start in range(0, len(faces), REC_MAX_BATCH):
+            chunk = faces[start:start + REC_MAX_BATCH]
+            n = len(chunk)
+
+            # warp straight into the preallocated staging buffer, same transform as norm_crop
+            for i, face in enumerate(chunk):
+                M = face_align.estimate_norm(face.kps, input_size)
+                cv2.warpAffine(img, M, (input_size, input_size), dst=self._align_u8[i], borderValue=0.0)
+
+            # BGR -> RGB and (x - mean) / std written through an NHWC view of the NCHW input buffer
+            blob = self._align_f32[:n]
+            nhwc = blob.transpose(0, 2, 3, 1)
+            np.subtract(self._align_u8[:n, :, :, ::-1], model.input_mean, out=nhwc, dtype=np.float32)
+            np.multiply(nhwc, 1.0 / model.input_std, out=nhwc)
+
+            embeddings = model.session.run(model.output_names, {model.input_name: blob})[0]
+            for face, embedding in zip(chunk, embeddings):
+                face.embedding = embedding.flatten()
+
+    def _get_genderage_batch(self, img, faces):
+        # same crop/normalization as genderage_model.get(), stacked into one blob per chunk
+        model = self.genderage_model
+        input_size = model.input_size[0]
+        for start in range(0, len(faces), GENDERAGE_MAX_BATCH):
+            chunk = faces[start:start + GENDERAGE_MAX_BATCH]
+            crops = []
+            for face in chunk:
+                bbox = face.bbox
+                w, h = (bbox[2] - bbox[0]), (bbox[3] - bbox[1])
+                center = (bbox[2] + bbox[0]) / 2, (bbox[3] + bbox[1]) / 2
+                scale = input_size / (max(w, h) * 1.5)
+                aimg, _ = face_align.transform(img, center, input_size, scale, 0)
+                crops.append(aimg)
+
+            blob = cv2.dnn.blobFromImages(
+                crops,
+                1.0 / model.input_std,
+                (input_size, input_size),
+                (model.input_mean, model.input_mean, model.input_mean),
+                swapRB=True,
+            )
+            preds = model.session.run(model.output_names, {model.input_name: blob})[0]
+            for face, pred in zip(chunk, preds):
+                face['gender'] = int(np.argmax(pred[:2]))
+                face['age'] = int(np.round(pred[2] * 100))
 
     def get(self, img, max_num=0):
-        bboxes, kpss = self.det_model.detect(
+        # one clock read per frame, shared by the tracker bookkeeping and draw_on
+        frame_time = time()
+        self._last_frame_time = frame_time
+
+        # nothing moved since the last analyzed frame - keep the current tracks, skip inference
+        small = cv2.cvtColor(cv2.resize(img, MOTION_GATE_SIZE, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+        if (
+            self.tracker is not None
+            and self.trackableObjects
+            and self._prev_small is not None
+            and self._skipped_frames < MOTION_GATE_MAX_SKIP
+            and cv2.absdiff(small, self._prev_small).mean() < MOTION_GATE_THRESHOLD
+        ):
+            self._skipped_frames += 1
+            for track_obj in self.trackableObjects.values():
+                track_obj.live = True
+            return self._last_faces
+        self._prev_small = small
+        self._skipped_frames = 0
+
+        # detector and eye-openness are independent, run them side by side
+        det_fut = self._pool.submit(
+            self.det_model.detect,
             img,
             max_num=max_num,
             metric='default',
         )
-        eye_opennesses = self.eye_openness_detector.detect_eye_openness(img)
+        eye_fut = self._eye_pool.submit(self.eye_openness_detector.detect_eye_openness, img)
+        bboxes, kpss = det_fut.result()
+        eye_opennesses = eye_fut.result()
         faces = []
-        rects = []
-        kps_list = []
 
-        for i in range(bboxes.shape[0]):
-            bbox = bboxes[i, 0:4]
-            det_score = bboxes[i, 4]
-            kps = None
+        if self.tracker is None:
+            for i in range(bboxes.shape[0]):
+                bbox = bboxes[i, 0:4]
+                det_score = bboxes[i, 4]
+                kps = None
 
-            if kpss is not None:
-                kps = kpss[i]
+                if kpss is not None:
+                    kps = kpss[i]
 
-            if self.tracker is None:
                 face = Face(bbox=bbox, kps=kps, det_score=det_score)
-                self.rec_model.get(img, face)
                 faces.append(face)
-            else:
-                landmarks = np.array(kps)
-                landmarks = np.transpose(landmarks).reshape(10, -1)
-                landmarks = np.transpose(landmarks)[0]
 
-                x1, y1, x2, y2 = int(bbox[0]), int(bbox[1]), int(bbox[2]), int(bbox[3])
+            self._get_embeddings(img, faces)
+        else:
+            # tracker input for all detections at once: int boxes and (N, 10) [x0..x4, y0..y4] landmarks
+            n = bboxes.shape[0]
+            rects = bboxes[:, 0:4].astype(np.int32)
+            kps_arr = np.asarray(kpss).transpose(0, 2, 1).reshape(n, 10).astype(np.int32)
 
-                kps = landmarks.astype('int')
-                rects.append([x1, y1, x2, y2])
-                kps_list.append(kps)
+            objects = self.tracker.update(rects, kps_arr, np.ones(n))
 
-        if self.tracker:
-            objects = self.tracker.update(np.array(rects), np.array(kps_list), np.ones(len(rects)))
+            prev_ids = set(self.trackableObjects.keys())
+            seen_ids = set()
 
-            for _, track_obj in self.trackableObjects.items():
-                track_obj.live = False
+            tracked = []
+            to_recognize = []
 
             for obj in objects:
                 objectID = obj[1]
-                bbox = obj[2:6]
+                seen_ids.add(objectID)
+                # materialized once and shared by the Face and the track (neither mutates them)
+                bbox = np.asarray(obj[2:6], dtype=np.float32)
                 kps = obj[6]
 
                 eye_openness_data = self.match_eye_openness(eye_opennesses, bbox)
-                
-                facial5points = [[kps[j], kps[j + 5]] for j in range(5)]
+
+                # back from the tracker's flat [x0..x4, y0..y4] layout to (5, 2) points
+                kps5 = np.asarray(kps).reshape(2, 5).T.astype(np.float32)
 
                 track_obj = self.trackableObjects.get(objectID, None)
 
                 if track_obj is None:
                     track_obj = TrackableObject(objectID, obj)
 
-                face = Face(bbox=np.array(bbox), kps=np.array(facial5points), det_score=1)
-                track_obj.bbox = np.array(bbox)
-                track_obj.kps = np.array(facial5points)
+                face = Face(bbox=bbox, kps=kps5, det_score=1)
+                track_obj.bbox = bbox
+                track_obj.kps = kps5
                 track_obj.live = True
                 track_obj.lost_count=0
 
                 if not track_obj.recognized:
-                    self.rec_model.get(img, face)
-
-                    person = self.find_face(face.embedding)
-
-                    if person:
-                        if person['score']>track_obj.score:
-                            track_obj.name=person['name']
-                            track_obj.pinfl = person["pinfl"]
-                            track_obj.score = person['score']
-                            track_obj.image_path = person['image_path']
-                            if person['name'] in self.record_people:
-                                cur = time()
-                                if cur - self.record_people[person['name']] > 15:
-                                    self.seen_people[person['name']] += 1
-                                self.record_people[person['name']] = cur
-                            else:
-                                self.record_people[person['name']] = time()
-                                self.seen_people[person['name']] = self.seen_people.get(person['name'], 0) + 1
-                            
-
-                    if track_obj.score > 0:
-                        track_obj.recognized = True
-
-                self.genderage_model.get(img, face)
+                    to_recognize.append((face, track_obj))
+                tracked.append((face, track_obj, eye_openness_data))
+
+                self.trackableObjects[objectID] = track_obj
+
+            # one recognition run for every not-yet-recognized track and one gender/age run
+            # (per chunk of GENDERAGE_MAX_BATCH) for all tracks, executed concurrently
+            rec_fut = self._pool.submit(self._get_embeddings, img, [face for face, _ in to_recognize])
+            age_fut = self._pool.submit(self._get_genderage_batch, img, [face for face, _, _ in tracked])
+            rec_fut.result()
+            age_fut.result()
+
+            for face, track_obj in to_recognize:
+                person = self.find_face(face.embedding)
+
+                if person:
+                    if person['score']>track_obj.score:
+                        track_obj.name=person['name']
+                        # red-flagged gallery names carry a " red" suffix, strip it once here not per draw
+                        track_obj.is_red = 'red' in person['name']
+                        track_obj.display_name = person['name'][:person['name'].index('red') - 1] if track_obj.is_red else person['name']
+                        track_obj.pinfl = person["pinfl"]
+                        track_obj.score = person['score']
+                        track_obj.image_path = person['image_path']
+                        if person['name'] in self.record_people:
+                            if frame_time - self.record_people[person['name']] > 15:
+                                self.seen_people[person['name']] += 1
+                            self.record_people[person['name']] = frame_time
+                        else:
+                            self.record_people[person['name']] = frame_time
+                            self.seen_people[person['name']] = self.seen_people.get(person['name'], 0) + 1
+                        
+
+                if track_obj.score > 0:
+                    track_obj.recognized = True
+
+            # Track cumulative eye closure duration
+            current_time = frame_time
+            for face, track_obj, eye_openness_data in tracked:
                 track_obj.age = face['age']
                 track_obj.gender = face['gender']
                 track_obj.left_eye_open = "unknown"
                 track_obj.right_eye_open = "unknown"
-                
-                # Track cumulative eye closure duration
-                current_time = time()
+
                 if eye_openness_data:
                     track_obj.left_eye_open = "Open" if eye_openness_data['left_eye_open'] else "Closed"
                     track_obj.right_eye_open = "Open" if eye_openness_data['right_eye_open'] else "Closed"
-                    
+
                     # Check if ANY eye is closed (left, right, or both)
                     any_eye_closed = not eye_openness_data['left_eye_open'] or not eye_openness_data['right_eye_open']
-                    
+
                     # Initialize last check time if needed
                     if track_obj.last_eye_check_time is None:
                         track_obj.last_eye_check_time = current_time
-                    
+
                     # Calculate time elapsed since last check
                     time_elapsed = current_time - track_obj.last_eye_check_time
-                    
+
                     if any_eye_closed:
                         # At least one eye is closed - accumulate the time
                         track_obj.cumulative_closed_time += time_elapsed
-                        
+
                         # If cumulative closed time reaches 3+ seconds, pause the timer
                         if track_obj.cumulative_closed_time >= 3.0:
                             track_obj.timer_paused = True
@@ -283,25 +542,25 @@ class FaceAnalysis:
                             track_obj.timer_paused = False
                         # Reset cumulative time so next closure starts fresh
                         track_obj.cumulative_closed_time = 0
-                    
+
                     # Update last check time
                     track_obj.last_eye_check_time = current_time
 
-                self.trackableObjects[objectID] = track_obj
-
-        # Remove dead objects from trackableObjects (objects that are no longer detected)
-        dead_objects = []
-        for objectID, track_obj in self.trackableObjects.items():
-            if not track_obj.live:
-                dead_objects.append(objectID)
-        
-        for objectID in dead_objects:
-            del self.trackableObjects[objectID]
+            # Remove dead objects from trackableObjects (objects that are no longer detected)
+            for objectID in prev_ids - seen_ids:
+                del self.trackableObjects[objectID]
 
+        self._last_faces = faces
         return faces
 
     def draw_on(self, img, faces):
-        dimg = img.copy()
+        return self.draw_on_inplace(img.copy(), faces)
+
+    def draw_on_inplace(self, dimg, faces):
+        # draws straight onto the caller's buffer, no full-frame copy
+        current_time = self._last_frame_time
+        PERSON_TIMERS.evict_stale(current_time)
+
         for _, track_obj in self.trackableObjects.items():
 
             if not track_obj.live:
@@ -316,10 +575,10 @@ class FaceAnalysis:
                     track_obj.name,
                 ]
 
-            elif 'red' in track_obj.name:
+            elif getattr(track_obj, 'is_red', False):
                 color = (0, 0, 255)
                 seen = self.seen_people[track_obj.name]
-                name = track_obj.name[:track_obj.name.index('red') - 1]
+                name = track_obj.display_name
                 person_info = [
                     f'R: {track_obj.left_eye_open} L: {track_obj.right_eye_open}',
                     name,
@@ -329,7 +588,6 @@ class FaceAnalysis:
                 ]
                 # Add timer for recognized persons
                 if hasattr(track_obj, 'recognized') and track_obj.recognized:
-                    current_time = time()
                     is_paused = getattr(track_obj, 'timer_paused', False)
                     seconds_visible = update_person_timer(name, current_time, is_paused)
                     timer_text = f"Time: {seconds_visible}s"
@@ -348,7 +606,6 @@ class FaceAnalysis:
                 ]
                 # Add timer for recognized persons
                 if hasattr(track_obj, 'recognized') and track_obj.recognized:
-                    current_time = time()
                     is_paused = getattr(track_obj, 'timer_paused', False)
                     seconds_visible = update_person_timer(track_obj.name, current_time, is_paused)
                     timer_text = f"Time: {seconds_visible}s"
@@ -402,10 +659,23 @@ class FaceAnalysis:
 
         return dimg
 
+    def _load_passport(self, path):
+        # decoded passport photos, LRU-capped so a large gallery can't grow it unbounded;
+        # shared across frames, so read-only - callers must copy before drawing on them
+        passport_img = self._passport_cache.get(path)
+        if passport_img is None:
+            passport_img = cv2.imread(path)
+            if passport_img is not None:
+                passport_img.setflags(write=False)
+            self._passport_cache[path] = passport_img
+            if len(self._passport_cache) > PASSPORT_CACHE_SIZE:
+                self._passport_cache.popitem(last=False)
+        else:
+            self._passport_cache.move_to_end(path)
+        return passport_img
+
     def draw_single_face(self, img, track_obj, padding=10):
         
-        dimg = img.copy()
-        
         # if not track_obj.live:
         #     return dimg
 
@@ -417,8 +687,8 @@ class FaceAnalysis:
         x2 = min(img.shape[1], x2 + padding)
         y2 = min(img.shape[0], y2 + padding)
 
-        passport_img = cv2.imread(track_obj.image_path) if track_obj.recognized else cv2.imread('./known_people/unk.jpg')
-        cropped_img = dimg[y1:y2, x1:x2]
+        passport_img = self._load_passport(track_obj.image_path) if track_obj.recognized else self._load_passport('./known_people/unk.jpg')
+        cropped_img = img[y1:y2, x1:x2].copy()
         age = track_obj.age
         person_info = [
             f'{track_obj.pinfl}',
@@ -447,6 +717,9 @@ class FaceAnalysis:
                 (74, 155, 79),
                 4,
             )
+        # the cached passport is read-only and shared; callers get their own copy as before
+        if passport_img is not None:
+            passport_img = passport_img.copy()
         return text_img, cropped_img, passport_img
     
     async def _add_todb(self, img, person_name, pinfl, image_path):
@@ -480,5 +753,6 @@ class FaceAnalysis:
         person["embedding"] = faces[0].embedding
         person["image_path"] = image_path
         self.known_people.append(person)
+        self._append_to_gallery(person)
 
         print("LEN AFTER: ", len(self.known_people))
\ No newline at end of file